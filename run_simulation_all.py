@@ -9,14 +9,145 @@ import os
 import sys
 import time
 import datetime
+import gzip
 import subprocess
 import re
 import argparse
+import contextlib
+import ctypes
+import logging
+import multiprocessing
 from pathlib import Path
 import shutil
-from concurrent.futures import ThreadPoolExecutor
+import threading
+from collections import deque
+from string import Template
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, ThreadPoolExecutor, wait
+from concurrent.futures.process import BrokenProcessPool
 from typing import Dict, List, Tuple, Optional
 
+# Configurations with at least this many pipeline stages are long-running
+# enough to be worth Verilator's -O3
+O3_MIN_PIPE_STAGES = 8
+
+# SystemVerilog sources compiled into every simulation
+SOURCES = ["arithmetic_modules.sv", "pipelined_arithmetic.sv", "tb_pipelined_arithmetic.sv"]
+
+# C++ entry point linked into the shared-library model for --in-process
+LIB_WRAPPER = "sim_lib.cpp"
+
+# Heat map cell colour for every integer pass rate (red at 0% to green at 100%)
+HEAT_MAP_COLORS = [
+    f"rgb({max(0, min(255, 255 - pass_rate * 2))}, {max(0, min(255, 55 + pass_rate * 2))}, 50)"
+    for pass_rate in range(101)
+]
+
+# Live per-module progress, enabled with -v
+logger = logging.getLogger("run_simulation_all")
+
+# HTML report templates, rendered with string.Template
+TEMPLATE_DIR = Path(__file__).resolve().parent / "templates"
+
+# Pass/fail line the testbench prints when a module's test ends
+_SENTINEL_RE = re.compile(rb"TEST (PASSED|FAILED)")
+
+# Indentation stripped from rendered HTML
+_MINIFY_RE = re.compile(r"\n\s+")
+
+# With --gzip, HTML reports at least this large also get a .gz copy
+GZIP_MIN_BYTES = 100 * 1024
+
+# With --quiet, only this many trailing lines of a failing module's output are logged
+QUIET_LOG_TAIL_LINES = 200
+
+
+def load_template(name: str) -> Template:
+    """Load and compile an HTML report template"""
+    return Template((TEMPLATE_DIR / name).read_text())
+
+
+def minify_html(html: str) -> str:
+    """Strip the indentation from rendered HTML"""
+    return _MINIFY_RE.sub("\n", html.lstrip())
+
+
+# Shared-library models loaded by this worker process, keyed by path
+_loaded_models: Dict[str, ctypes.CDLL] = {}
+
+
+def run_module_in_process(lib_path: str, module_id: int, log_file: str,
+                          dumpfile: Optional[str] = None) -> int:
+    """Run one module on a shared-library model loaded once per worker process"""
+    lib = _loaded_models.get(lib_path)
+    if lib is None:
+        lib = ctypes.CDLL(lib_path)
+        lib.run_module.argtypes = [ctypes.c_int, ctypes.c_char_p]
+        lib.run_module.restype = ctypes.c_int
+        _loaded_models[lib_path] = lib
+    
+    # The model prints straight to file descriptors 1 and 2, so point them
+    # at the module's log for the duration of the call
+    sys.stdout.flush()
+    sys.stderr.flush()
+    saved_stdout, saved_stderr = os.dup(1), os.dup(2)
+    try:
+        with open(log_file, "wb") as log:
+            os.dup2(log.fileno(), 1)
+            os.dup2(log.fileno(), 2)
+            return lib.run_module(module_id, dumpfile.encode() if dumpfile else None)
+    finally:
+        os.dup2(saved_stdout, 1)
+        os.dup2(saved_stderr, 2)
+        os.close(saved_stdout)
+        os.close(saved_stderr)
+
+
+class SimWorkerPool:
+    """Worker processes for --in-process simulations that survive a crashing model"""
+    def __init__(self, max_workers: int):
+        self.max_workers = max_workers
+        self._lock = threading.Lock()
+        self._executor = self._new_executor(max_workers)
+    
+    @staticmethod
+    def _new_executor(max_workers: int) -> ProcessPoolExecutor:
+        return ProcessPoolExecutor(max_workers=max_workers, mp_context=multiprocessing.get_context("spawn"))
+    
+    def run_module(self, lib_path: str, module_id: int, log_file: str,
+                   dumpfile: Optional[str] = None) -> int:
+        """Run one module in a worker process, see run_module_in_process"""
+        with self._lock:
+            executor = self._executor
+        try:
+            return executor.submit(run_module_in_process, lib_path, module_id, log_file, dumpfile).result()
+        except BrokenProcessPool:
+            # A worker died and took every call queued on the pool with it;
+            # the first caller to notice replaces the pool for later modules
+            with self._lock:
+                if self._executor is executor:
+                    self._executor = self._new_executor(self.max_workers)
+                    executor.shutdown(wait=False)
+        
+        # There is no telling which of the failed calls crashed the worker, so
+        # rerun this module in a process of its own: only the culprit fails again
+        with self._new_executor(1) as isolated:
+            return isolated.submit(run_module_in_process, lib_path, module_id, log_file, dumpfile).result()
+    
+    def __enter__(self):
+        return self
+    
+    def __exit__(self, *exc_info):
+        with self._lock:
+            self._executor.shutdown()
+
+
+def gzip_large_html(html_file: str):
+    """Write a gzip-compressed copy of an HTML report if it is large"""
+    if os.path.getsize(html_file) < GZIP_MIN_BYTES:
+        return
+    with open(html_file, "rb") as src, gzip.open(f"{html_file}.gz", "wb") as dst:
+        shutil.copyfileobj(src, dst)
+
 
 class ModuleTest:
     """Class to manage testing a single module with specific configuration"""
@@ -26,210 +157,345 @@ class ModuleTest:
         self.pipe_stages = pipe_stages
         self.log_dir = log_dir
         self.config_dir = f"{log_dir}/w{width}_p{pipe_stages}"
-        self.log_file = f"{self.config_dir}/module_{module_id}.log"
+        self.log_file: Optional[str] = f"{self.config_dir}/module_{module_id}.log"
         self.duration = 0
         self.status = "UNKNOWN"
         self.config_key = f"{width}_{pipe_stages}"
+        # Console output is buffered here and written in module order once all tests finish
+        self.console_lines: List[str] = []
+    
+    def run_sim_only(self, exe_path: str, trace: bool = False, quiet: bool = False) -> bool:
+        """Run the configuration's compiled simulation for this module"""
+        start_time = time.time()
         
-        # Ensure log directory exists
-        os.makedirs(self.config_dir, exist_ok=True)
+        # Run simulation from the configuration's log directory so each
+        # module gets its own waveform dump
+        sim_cmd = [os.path.abspath(exe_path), f"+MODULE_ID={self.module_id}"]
+        if trace:
+            sim_cmd.append(f"+DUMPFILE=module_{self.module_id}.fst")
+        
+        passed = False
+        with subprocess.Popen(sim_cmd, cwd=self.config_dir, stdout=subprocess.PIPE,
+                              stderr=subprocess.STDOUT, bufsize=1 << 16) as proc:
+            if quiet:
+                # Keep only the tail of the output in memory, and discard the
+                # rest of it once the test has passed
+                tail = deque(maxlen=QUIET_LOG_TAIL_LINES)
+                line_count = 0
+                for line in proc.stdout:
+                    tail.append(line)
+                    line_count += 1
+                    sentinel = _SENTINEL_RE.search(line)
+                    if sentinel:
+                        passed = sentinel.group(1) == b"PASSED"
+                        break
+                if passed:
+                    while proc.stdout.read(1 << 16):
+                        pass
+                    self.log_file = None
+                else:
+                    for line in proc.stdout:
+                        tail.append(line)
+                        line_count += 1
+                    self._write_log_tail(tail, line_count)
+            else:
+                # Stream the output into a buffered log, stop inspecting it as soon as
+                # the pass/fail sentinel shows up and copy the remainder through unchecked
+                with open(self.log_file, "wb", buffering=1 << 20) as log:
+                    for line in proc.stdout:
+                        log.write(line)
+                        sentinel = _SENTINEL_RE.search(line)
+                        if sentinel:
+                            passed = sentinel.group(1) == b"PASSED"
+                            break
+                    shutil.copyfileobj(proc.stdout, log)
+        
+        return self._finish(passed, start_time)
     
-    def run_test(self) -> bool:
-        """Run compilation and simulation for this module"""
+    def run_in_process(self, lib_path: str, sim_pool: SimWorkerPool, trace: bool = False,
+                       quiet: bool = False) -> bool:
+        """Run this module on the configuration's shared-library model in a worker process"""
         start_time = time.time()
-        print(f"Testing module {self.module_id}...", end=" ", flush=True)
-        
-        # Compile with Verilator
-        with open(self.log_file, "w") as log:
-            compile_result = subprocess.run([
-                "verilator", "--binary", "--timing", "--assert", "--autoflush", "-j", "2", "-sv",
-                "-Wno-CASEINCOMPLETE", "-Wno-REALCVT", "-Wno-SELRANGE", "-Wno-TIMESCALEMOD",
-                "-Wno-UNSIGNED", "-Wno-WIDTH", "-CFLAGS", "-O1", "-Wno-fatal",
-                "--trace-structs", "--trace-params", "--trace-fst",
-                "-top", "tb_pipelined_arithmetic",
-                "-o", f"sim_w{self.width}_p{self.pipe_stages}_m{self.module_id}.exe",
-                f"+define+SIMULATION",
-                f"+define+MODULE_ID={self.module_id}",
-                f"+define+WIDTH={self.width}",
-                f"+define+PIPE_STAGES={self.pipe_stages}",
-                "arithmetic_modules.sv", "pipelined_arithmetic.sv", "tb_pipelined_arithmetic.sv"
-            ], stdout=log, stderr=log)
-            
-            if compile_result.returncode != 0:
-                print("COMPILE FAILED")
-                self.status = "COMPILE FAILED"
-                self.duration = time.time() - start_time
-                return False
-            
-            # Run simulation
-            sim_result = subprocess.run(
-                [f"./obj_dir/sim_w{self.width}_p{self.pipe_stages}_m{self.module_id}.exe"],
-                stdout=log, stderr=log
-            )
-            
-        # Check for pass/fail
-        self.duration = time.time() - start_time
-        with open(self.log_file, "r") as log:
-            log_content = log.read()
-            if "TEST PASSED" in log_content:
-                print(f"PASSED ({self.duration:.1f}s)")
-                self.status = "PASSED"
-                return True
+        
+        dumpfile = os.path.abspath(f"{self.config_dir}/module_{self.module_id}.fst") if trace else None
+        try:
+            sim_pool.run_module(os.path.abspath(lib_path), self.module_id,
+                                os.path.abspath(self.log_file), dumpfile)
+            with open(self.log_file, "rb") as log:
+                sentinel = _SENTINEL_RE.search(log.read())
+            passed = sentinel is not None and sentinel.group(1) == b"PASSED"
+        except Exception as e:
+            # Only a model that also aborts when run on its own ends up here
+            logger.warning("WIDTH=%d, PIPE_STAGES=%d: module %d crashed: %s",
+                           self.width, self.pipe_stages, self.module_id, e)
+            # Keep the reason next to whatever output the model got out, so the
+            # report's log link always has something to show
+            with open(self.log_file, "a") as log:
+                log.write(f"\nModule crashed: {e}\n")
+            passed = False
+        
+        # The model writes straight to the log, so --quiet can only drop or
+        # trim it afterwards
+        if quiet:
+            if passed:
+                os.remove(self.log_file)
+                self.log_file = None
             else:
-                print(f"FAILED ({self.duration:.1f}s)")
-                self.status = "FAILED"
-                return False
+                with open(self.log_file, "rb") as log:
+                    lines = log.readlines()
+                self._write_log_tail(deque(lines, maxlen=QUIET_LOG_TAIL_LINES), len(lines))
+        
+        return self._finish(passed, start_time)
+    
+    def _finish(self, passed: bool, start_time: float) -> bool:
+        """Record this module's result and console line"""
+        self.duration = time.time() - start_time
+        if passed:
+            self.status = "PASSED"
+            self._add_console_line(f"PASSED ({self.duration:.1f}s)")
+            return True
+        else:
+            self.status = "FAILED"
+            self._add_console_line(f"FAILED ({self.duration:.1f}s)")
+            return False
+    
+    def _write_log_tail(self, tail: deque, line_count: int):
+        """Write the buffered end of a failing module's output to its log"""
+        with open(self.log_file, "wb") as log:
+            if line_count > len(tail):
+                log.write(f"[--quiet: showing only the last {len(tail)} of {line_count} lines of output]\n".encode())
+            log.writelines(tail)
+    
+    def mark_compile_failed(self, compile_log: str):
+        """Fail this module because its configuration did not compile"""
+        self.status = "COMPILE FAILED"
+        self.log_file = compile_log
+        self._add_console_line("COMPILE FAILED")
+    
+    def _add_console_line(self, result: str):
+        """Buffer this module's console line and log it immediately in verbose mode"""
+        self.console_lines.append(f"Testing module {self.module_id}... {result}\n")
+        logger.info("WIDTH=%d, PIPE_STAGES=%d: module %d %s",
+                    self.width, self.pipe_stages, self.module_id, result)
 
 
 class ConfigurationTest:
-    """Class to manage testing all modules for a specific configuration"""
-    def __init__(self, width: int, pipe_stages: int, total_modules: int, log_dir: str):
+    """Class to compile, collect and report results of all modules for a specific configuration"""
+    def __init__(self, width: int, pipe_stages: int, total_modules: int, log_dir: str,
+                 build_jobs: Optional[int] = None, trace: bool = False,
+                 force_rebuild: bool = False, in_process: bool = False, quiet: bool = False):
         self.width = width
         self.pipe_stages = pipe_stages
         self.total_modules = total_modules
         self.log_dir = log_dir
+        self.trace = trace
+        self.force_rebuild = force_rebuild
+        self.in_process = in_process
+        self.quiet = quiet
         self.config_dir = f"{log_dir}/w{width}_p{pipe_stages}"
         self.config_key = f"{width}_{pipe_stages}"
+        self.compile_log = f"{self.config_dir}/compile.log"
+        self.report_file = f"{self.config_dir}/report.html"
+        # One Verilator model per configuration, shared by all of its modules:
+        # a simulation binary, or a shared library for --in-process
+        self.obj_dir = f"obj_dir/w{width}_p{pipe_stages}"
+        if in_process:
+            self.model_path = f"{self.obj_dir}/libsim_w{width}_p{pipe_stages}.so"
+            self.sources = SOURCES + [LIB_WRAPPER]
+        else:
+            self.model_path = f"{self.obj_dir}/sim_w{width}_p{pipe_stages}.exe"
+            self.sources = SOURCES
+        # Verilator arguments the model was built with, used to detect stale builds
+        self.build_args_file = f"{self.obj_dir}/build_args"
+        # Parallel C++ build jobs for this configuration's Verilator compile
+        self.build_jobs = build_jobs or min(os.cpu_count() or 1, 4)
+        self.compiled: Optional[bool] = None
+        self.cached = False
+        self.compile_duration = 0
         self.passed = 0
         self.failed = 0
         self.duration = 0
-        self.module_tests: List[ModuleTest] = []
-        
-        # Create config directory
-        os.makedirs(self.config_dir, exist_ok=True)
-        
-    def run(self) -> Tuple[int, int, float]:
-        """Run tests for all modules with this configuration"""
-        print("--------------------------------------------------------------------")
-        print(f"Testing configuration: WIDTH={self.width}, PIPE_STAGES={self.pipe_stages}")
-        print("--------------------------------------------------------------------")
+        self.module_tests: List[ModuleTest] = [
+            ModuleTest(module_id, width, pipe_stages, log_dir)
+            for module_id in range(1, total_modules + 1)
+        ]
+    
+    def compile_once_per_config(self) -> bool:
+        """Compile the simulation for all modules of this configuration"""
+        if self.compiled is not None:
+            return self.compiled
         
         start_time = time.time()
         
-        # Test each module
-        for module_id in range(1, self.total_modules + 1):
-            test = ModuleTest(module_id, self.width, self.pipe_stages, self.log_dir)
-            self.module_tests.append(test)
-            success = test.run_test()
-            if success:
-                self.passed += 1
-            else:
-                self.failed += 1
+        # MODULE_ID=0 builds every module into one model; the simulation
+        # selects the module under test with +MODULE_ID=N
+        build_args = [
+            "--timing", "--assert", "--autoflush", "-sv",
+            "-Wno-CASEINCOMPLETE", "-Wno-REALCVT", "-Wno-SELRANGE", "-Wno-TIMESCALEMOD",
+            "-Wno-UNSIGNED", "-Wno-WIDTH", "-CFLAGS", "-O1 -fstrict-aliasing", "-Wno-fatal",
+            # Split the generated model so the parallel make has several files to build
+            "--output-split", "5000", "--output-split-cfuncs", "500",
+            "-top", "tb_pipelined_arithmetic",
+            "--Mdir", self.obj_dir,
+            "-o", os.path.basename(self.model_path),
+            f"+define+SIMULATION",
+            "-GMODULE_ID=0",
+            f"-GNUM_MODULES={self.total_modules}",
+            f"-GWIDTH={self.width}",
+            f"-GPIPE_STAGES={self.pipe_stages}",
+        ] + self.sources
+        if self.in_process:
+            # Link the model and its run_module() entry point as a shared library
+            build_args[0:0] = ["--cc", "--exe", "--build", "-CFLAGS", "-fPIC", "-LDFLAGS", "-shared"]
+        else:
+            build_args[0:0] = ["--binary"]
+        if self.trace:
+            build_args[0:0] = ["--trace-structs", "--trace-params", "--trace-fst"]
+        if self.pipe_stages >= O3_MIN_PIPE_STAGES:
+            build_args[0:0] = ["-O3"]
+        build_stamp = "\n".join(build_args)
         
-        self.duration = time.time() - start_time
+        # Reuse the binary from a previous run if it is newer than the sources
+        # and was built with the same arguments
+        if not self.force_rebuild and self._is_up_to_date(build_stamp):
+            with open(self.compile_log, "w") as log:
+                log.write(f"Reusing up-to-date {self.model_path} (use --force-rebuild to recompile)\n")
+            self.cached = True
+            self.compiled = True
+            return self.compiled
         
-        # Print configuration summary
-        self._print_summary()
+        # Drop the stamp first so an interrupted or failed build is never reused
+        if os.path.exists(self.build_args_file):
+            os.remove(self.build_args_file)
         
-        # Generate HTML report for this configuration
-        self._generate_html_report()
+        with open(self.compile_log, "w") as log:
+            compile_result = subprocess.run(
+                ["verilator", "-j", str(self.build_jobs)] + build_args, stdout=log, stderr=log
+            )
+        
+        self.compile_duration = time.time() - start_time
+        self.duration += self.compile_duration
+        self.compiled = compile_result.returncode == 0
+        if self.compiled:
+            with open(self.build_args_file, "w") as stamp:
+                stamp.write(build_stamp)
+        return self.compiled
+    
+    def _is_up_to_date(self, build_stamp: str) -> bool:
+        """Check whether the existing model can be reused for this configuration"""
+        bin_path = Path(self.model_path)
+        stamp_path = Path(self.build_args_file)
+        if not bin_path.exists() or not stamp_path.exists():
+            return False
+        if stamp_path.read_text() != build_stamp:
+            return False
+        return bin_path.stat().st_mtime > max(Path(source).stat().st_mtime for source in self.sources)
+    
+    def record(self, test: ModuleTest, success: bool):
+        """Record the outcome of one of this configuration's module tests"""
+        if success:
+            self.passed += 1
+        else:
+            self.failed += 1
+        # Modules run interleaved with other configurations, so the
+        # configuration time is its compile time plus the sum of its module times
+        self.duration += test.duration
+    
+    @property
+    def complete(self) -> bool:
+        """Whether every module of this configuration has a result"""
+        return self.passed + self.failed == self.total_modules
+    
+    def report(self, report_template: Template, style: str, date: str) -> Tuple[int, int, float]:
+        """Generate the HTML report once all modules have run"""
+        self._generate_html_report(report_template, style, date)
         
         return self.passed, self.failed, self.duration
     
-    def _print_summary(self):
-        """Print summary table for this configuration"""
-        print()
-        print(f"Configuration Summary: WIDTH={self.width}, PIPE_STAGES={self.pipe_stages}")
-        print("-----------------------------------------------------------------------")
-        print(f"{'MODULE':<8} | {'STATUS':<15} | {'TIME (sec)':<10}")
-        print("-----------------------------------------------------------------------")
+    def console_report(self) -> str:
+        """Render the console output and summary table for this configuration"""
+        lines = [
+            "--------------------------------------------------------------------\n",
+            f"Testing configuration: WIDTH={self.width}, PIPE_STAGES={self.pipe_stages}\n",
+            "--------------------------------------------------------------------\n",
+        ]
+        if self.cached:
+            lines.append(f"Reusing up-to-date {self.model_path}\n")
+        elif self.compiled:
+            lines.append(f"Compiled in {self.compile_duration:.1f}s\n")
         
+        # Per-module output in module order
         for test in self.module_tests:
-            print(f"Module {test.module_id:<2} | {test.status:<15} | {test.duration:<10.1f}")
+            lines.extend(test.console_lines)
         
-        print("-----------------------------------------------------------------------")
-        print(f"{'TOTAL':<8} | {f'{self.passed} passed, {self.failed} failed':<15} | {self.duration:<10.1f} seconds")
-        print("-----------------------------------------------------------------------")
-        print()
+        # Configuration summary
+        lines.append("\n")
+        lines.append(f"Configuration Summary: WIDTH={self.width}, PIPE_STAGES={self.pipe_stages}\n")
+        lines.append("-----------------------------------------------------------------------\n")
+        lines.append(f"{'MODULE':<8} | {'STATUS':<15} | {'TIME (sec)':<10}\n")
+        lines.append("-----------------------------------------------------------------------\n")
+        
+        for test in self.module_tests:
+            lines.append(f"Module {test.module_id:<2} | {test.status:<15} | {test.duration:<10.1f}\n")
+        
+        lines.append("-----------------------------------------------------------------------\n")
+        lines.append(f"{'TOTAL':<8} | {f'{self.passed} passed, {self.failed} failed':<15} | {self.duration:<10.1f} seconds\n")
+        lines.append("-----------------------------------------------------------------------\n")
+        lines.append("\n")
+        return "".join(lines)
     
-    def _generate_html_report(self):
+    def _generate_html_report(self, report_template: Template, style: str, date: str):
         """Generate HTML report for this configuration"""
-        html_file = f"{self.config_dir}/report.html"
-        
-        with open(html_file, "w") as f:
-            f.write(f"""<!DOCTYPE html>
-<html>
-<head>
-    <title>Test Report: WIDTH={self.width}, PIPE_STAGES={self.pipe_stages}</title>
-    <style>
-        body {{ font-family: Arial, sans-serif; margin: 20px; }}
-        table {{ border-collapse: collapse; width: 100%; }}
-        th, td {{ padding: 8px; text-align: left; border: 1px solid #ddd; }}
-        th {{ background-color: #f2f2f2; }}
-        tr.passed td:nth-child(2) {{ color: green; font-weight: bold; }}
-        tr.failed td:nth-child(2) {{ color: red; font-weight: bold; }}
-        tr.summary {{ font-weight: bold; background-color: #f2f2f2; }}
-        .summary-box {{ 
-            padding: 10px;
-            margin-top: 20px;
-            border-radius: 5px;
-            text-align: center;
-            font-weight: bold;
-        }}
-        .success {{ background-color: #dff0d8; color: #3c763d; }}
-        .failure {{ background-color: #f2dede; color: #a94442; }}
-    </style>
-</head>
-<body>
-    <h1>Test Report: WIDTH={self.width}, PIPE_STAGES={self.pipe_stages}</h1>
-    <p><strong>Date:</strong> {datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S")}</p>
-    
-    <h2>Results</h2>
-    <table>
-        <tr>
-            <th>Module</th>
-            <th>Status</th>
-            <th>Log File</th>
-        </tr>
-""")
-            
-            # Add rows for each module
-            for test in self.module_tests:
-                status_class = "passed" if test.status == "PASSED" else "failed"
-                log_filename = f"module_{test.module_id}.log"
-                
-                f.write(f"""        <tr class="{status_class}">
-            <td>Module {test.module_id}</td>
-            <td>{test.status}</td>
-            <td><a href="{log_filename}" target="_blank">View Log</a></td>
-        </tr>
-""")
-            
-            # Add summary row
-            f.write(f"""        <tr class="summary">
-            <td>TOTAL</td>
-            <td>{self.passed} passed, {self.failed} failed</td>
-            <td>{self.duration:.1f} seconds</td>
-        </tr>
-    </table>
-""")
-            
-            # Add summary box
-            if self.failed == 0:
-                f.write("""    <div class="summary-box success">
-        ALL TESTS PASSED! 🎉
-    </div>
-""")
+        # Render rows for each module
+        rows: List[str] = []
+        for test in self.module_tests:
+            status_class = "passed" if test.status == "PASSED" else "failed"
+            if test.log_file:
+                log_cell = f'<a href="{os.path.basename(test.log_file)}" target="_blank">View Log</a>'
             else:
-                f.write(f"""    <div class="summary-box failure">
-        SOME TESTS FAILED! ❌ ({self.failed} out of {self.total_modules})
-    </div>
-""")
+                log_cell = "Not logged (--quiet)"
             
-            # Add navigation link and close HTML
-            f.write("""    <p><a href="../dashboard.html">Back to Dashboard</a></p>
-</body>
-</html>
+            rows.append(f"""<tr class="{status_class}">
+<td>Module {test.module_id}</td>
+<td>{test.status}</td>
+<td>{log_cell}</td>
+</tr>
 """)
+        
+        if self.failed == 0:
+            summary_class = "success"
+            summary_text = "ALL TESTS PASSED! 🎉"
+        else:
+            summary_class = "failure"
+            summary_text = f"SOME TESTS FAILED! ❌ ({self.failed} out of {self.total_modules})"
+        
+        with open(self.report_file, "w") as f:
+            f.write(minify_html(report_template.substitute(
+                style=style, width=self.width, pipe_stages=self.pipe_stages, date=date,
+                rows="".join(rows), passed=self.passed, failed=self.failed,
+                duration=f"{self.duration:.1f}",
+                summary_class=summary_class, summary_text=summary_text
+            )))
 
 
 class TestSuite:
     """Main class to run all tests for multiple configurations"""
-    def __init__(self, widths: List[int], pipe_stages: List[int], total_modules: int):
+    def __init__(self, widths: List[int], pipe_stages: List[int], total_modules: int,
+                 jobs: Optional[int] = None, trace: bool = False, force_rebuild: bool = False,
+                 gzip_reports: bool = False, in_process: bool = False, quiet: bool = False):
         self.widths = widths
         self.pipe_stages = pipe_stages
         self.total_modules = total_modules
-        self.timestamp = datetime.datetime.now().strftime("%Y-%m-%d_%H-%M-%S")
+        self.jobs = jobs or os.cpu_count() or 1
+        self.trace = trace
+        self.force_rebuild = force_rebuild
+        self.gzip_reports = gzip_reports
+        self.in_process = in_process
+        self.quiet = quiet
+        now = datetime.datetime.now()
+        self.timestamp = now.strftime("%Y-%m-%d_%H-%M-%S")
+        self._now_str = now.strftime("%Y-%m-%d %H:%M:%S")
+        self._total_configs = len(widths) * len(pipe_stages)
         self.log_dir = f"simulation_logs_{self.timestamp}"
         self.config_results: Dict[str, Dict[str, int]] = {}
         self.total_tests = 0
@@ -237,6 +503,14 @@ class TestSuite:
         self.total_failed = 0
         self.total_duration = 0
         
+        # Load report templates once for every configuration
+        self._style = (TEMPLATE_DIR / "style.css").read_text()
+        self._cfg_tpl = load_template("config_report.html")
+        self._dashboard_header_tpl = load_template("dashboard_header.html")
+        self._dashboard_summary_tpl = load_template("dashboard_summary.html")
+        self._dashboard_results = minify_html((TEMPLATE_DIR / "dashboard_results.html").read_text())
+        self._dashboard_footer_tpl = load_template("dashboard_footer.html")
+        
         # Create log directory
         os.makedirs(self.log_dir, exist_ok=True)
     
@@ -252,182 +526,206 @@ class TestSuite:
         print("=======================================================================")
         print()
         
-        # Test all configurations
-        for width in self.widths:
-            for pipe_stages in self.pipe_stages:
-                config = ConfigurationTest(width, pipe_stages, self.total_modules, self.log_dir)
-                passed, failed, duration = config.run()
-                
-                config_key = f"{width}_{pipe_stages}"
-                self.config_results[config_key] = {
-                    "width": width,
-                    "pipe_stages": pipe_stages,
-                    "passed": passed,
-                    "failed": failed,
-                    "duration": duration
-                }
-                
-                self.total_tests += self.total_modules
-                self.total_passed += passed
-                self.total_failed += failed
+        # Share the CPUs between concurrent Verilator builds instead of oversubscribing
+        workers = min(self.jobs, self._total_configs * self.total_modules)
+        build_jobs = max(1, (os.cpu_count() or 1) // min(workers, self._total_configs))
+        
+        configs = [
+            ConfigurationTest(width, pipe_stages, self.total_modules, self.log_dir, build_jobs,
+                              trace=self.trace, force_rebuild=self.force_rebuild,
+                              in_process=self.in_process, quiet=self.quiet)
+            for width in self.widths
+            for pipe_stages in self.pipe_stages
+        ]
+        
+        # Create every configuration's log directory before dispatching any work
+        for config in configs:
+            os.makedirs(config.config_dir, exist_ok=True)
+        
+        # Start the dashboard now and add each configuration's row as soon as it
+        # completes, so partial results can be viewed during a long run
+        html_file = f"{self.log_dir}/dashboard.html"
+        self._update_latest_link()
+        print(f"Live dashboard: {html_file}")
+        print(flush=True)
+        
+        with open(html_file, "w") as dashboard:
+            # The overall summary is only known at the end, so the live
+            # dashboard starts straight with the results table
+            dashboard.write(minify_html(self._dashboard_header_tpl.substitute(style=self._style)))
+            dashboard.write(self._dashboard_results)
+            dashboard.flush()
+            
+            # Compile each configuration once, then run its modules' simulations
+            # from the same pool as soon as its model is ready, so the workers stay
+            # busy until the very last job finishes. With --in-process the
+            # simulations themselves run in worker processes that keep each
+            # configuration's shared-library model loaded between modules.
+            sim_pool_context = SimWorkerPool(workers) if self.in_process else contextlib.nullcontext()
+            with ThreadPoolExecutor(max_workers=workers) as pool, sim_pool_context as sim_pool:
+                pending = {pool.submit(config.compile_once_per_config): (config, None) for config in configs}
+                while pending:
+                    done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                    for future in done:
+                        config, test = pending.pop(future)
+                        if test is not None:
+                            config.record(test, future.result())
+                        elif future.result():
+                            if config.cached:
+                                logger.info("WIDTH=%d, PIPE_STAGES=%d: reusing up-to-date %s",
+                                            config.width, config.pipe_stages, config.model_path)
+                            else:
+                                logger.info("WIDTH=%d, PIPE_STAGES=%d: compiled in %.1fs",
+                                            config.width, config.pipe_stages, config.compile_duration)
+                            for test in config.module_tests:
+                                if self.in_process:
+                                    future = pool.submit(test.run_in_process, config.model_path, sim_pool,
+                                                         trace=config.trace, quiet=config.quiet)
+                                else:
+                                    future = pool.submit(test.run_sim_only, config.model_path,
+                                                         trace=config.trace, quiet=config.quiet)
+                                pending[future] = (config, test)
+                        else:
+                            for test in config.module_tests:
+                                test.mark_compile_failed(config.compile_log)
+                                config.record(test, False)
+                        
+                        if config.complete:
+                            self._record_config(config, dashboard)
         
         self.total_duration = time.time() - start_time
         
+        # Write every configuration's console output in one go, in sweep order
+        sys.stdout.write("\n" + "".join(config.console_report() for config in configs))
+        sys.stdout.flush()
+        
         # Print final summary
         self._print_summary()
         
-        # Generate dashboard HTML
-        self._generate_dashboard()
+        # Replace the live dashboard with the final one
+        self._finish_dashboard(html_file)
         
-        # Create a symbolic link to the latest run
-        try:
-            if os.path.exists("latest_results"):
-                os.remove("latest_results")
-            os.symlink(self.log_dir, "latest_results")
-        except Exception as e:
-            print(f"Warning: Could not create symbolic link: {e}")
+        if self.gzip_reports:
+            gzip_large_html(html_file)
         
         print()
         print("Test suite completed!")
         print(f"Dashboard HTML report generated: {self.log_dir}/dashboard.html")
         print("View the report at: latest_results/dashboard.html")
     
+    def _record_config(self, config: ConfigurationTest, dashboard):
+        """Report a completed configuration and add it to the dashboard"""
+        passed, failed, duration = config.report(self._cfg_tpl, self._style, self._now_str)
+        if self.gzip_reports:
+            gzip_large_html(config.report_file)
+        
+        result = {
+            "width": config.width,
+            "pipe_stages": config.pipe_stages,
+            "passed": passed,
+            "failed": failed,
+            "duration": duration
+        }
+        self.config_results[config.config_key] = result
+        
+        self.total_tests += self.total_modules
+        self.total_passed += passed
+        self.total_failed += failed
+        
+        self._append_dashboard_row(dashboard, config.width, config.pipe_stages, result)
+        dashboard.flush()
+        
+        # Per-module results are only printed at the end, so show progress here
+        print(f"WIDTH={config.width}, PIPE_STAGES={config.pipe_stages}: "
+              f"{passed} passed, {failed} failed ({duration:.1f}s)", flush=True)
+    
+    def _update_latest_link(self):
+        """Point the latest_results link at this run's log directory"""
+        # Swap in a freshly created link with os.replace, which is atomic
+        tmp_link = f"latest_results.{os.getpid()}.tmp"
+        try:
+            os.symlink(self.log_dir, tmp_link)
+            os.replace(tmp_link, "latest_results")
+        except Exception as e:
+            if os.path.lexists(tmp_link):
+                os.remove(tmp_link)
+            print(f"Warning: Could not create symbolic link: {e}")
+    
     def _print_summary(self):
         """Print final summary table"""
         print("=======================================================================")
         print("                    FINAL TEST SUMMARY")
         print("=======================================================================")
-        print(f"Total configurations tested: {len(self.widths)}x{len(self.pipe_stages)} = {len(self.widths) * len(self.pipe_stages)}")
+        print(f"Total configurations tested: {len(self.widths)}x{len(self.pipe_stages)} = {self._total_configs}")
         print(f"Total modules tested: {self.total_tests}")
         print(f"Total tests passed: {self.total_passed}")
         print(f"Total tests failed: {self.total_failed}")
         print(f"Total time: {self.total_duration:.1f} seconds")
         print("=======================================================================")
     
-    def _generate_dashboard(self):
-        """Generate HTML dashboard with all results"""
-        html_file = f"{self.log_dir}/dashboard.html"
-        
-        with open(html_file, "w") as f:
-            f.write(f"""<!DOCTYPE html>
-<html>
-<head>
-    <title>Pipeline Arithmetic Module Test Dashboard</title>
-    <style>
-        body {{ font-family: Arial, sans-serif; margin: 20px; }}
-        table {{ border-collapse: collapse; width: 100%; margin-bottom: 20px; }}
-        th, td {{ padding: 8px; text-align: left; border: 1px solid #ddd; }}
-        th {{ background-color: #f2f2f2; }}
-        .dashboard-title {{ text-align: center; margin-bottom: 20px; }}
-        .summary {{ background-color: #f9f9f9; padding: 15px; margin-bottom: 20px; border-radius: 5px; }}
-        .config-table {{ margin-top: 30px; }}
-        .passed {{ color: green; font-weight: bold; }}
-        .failed {{ color: red; font-weight: bold; }}
-        .highlight {{ background-color: #ffffd0; }}
-        .summary-box {{ 
-            padding: 10px;
-            margin-top: 20px;
-            border-radius: 5px;
-            text-align: center;
-            font-weight: bold;
-        }}
-        .success {{ background-color: #dff0d8; color: #3c763d; }}
-        .failure {{ background-color: #f2dede; color: #a94442; }}
-    </style>
-</head>
-<body>
-    <h1 class="dashboard-title">Pipeline Arithmetic Module Test Dashboard</h1>
-    
-    <div class="summary">
-        <h2>Overall Summary</h2>
-        <p><strong>Date:</strong> {datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S")}</p>
-        <p><strong>Configurations Tested:</strong> {len(self.widths)}x{len(self.pipe_stages)} = {len(self.widths) * len(self.pipe_stages)}</p>
-        <p><strong>Total Tests:</strong> {self.total_tests}</p>
-        <p><strong>Tests Passed:</strong> <span class="passed">{self.total_passed}</span></p>
-        <p><strong>Tests Failed:</strong> <span class="failed">{self.total_failed}</span></p>
-        <p><strong>Total Runtime:</strong> {self.total_duration:.1f} seconds</p>
-    </div>
-    
-    <h2>Configuration Results</h2>
-    <table class="config-table">
-        <tr>
-            <th>Width</th>
-            <th>Pipeline Stages</th>
-            <th>Pass</th>
-            <th>Fail</th>
-            <th>Time (sec)</th>
-            <th>Actions</th>
-        </tr>
-""")
-            
-            # Add rows for each configuration
-            for width in self.widths:
-                for pipe_stages in self.pipe_stages:
-                    config_key = f"{width}_{pipe_stages}"
-                    if config_key in self.config_results:
-                        result = self.config_results[config_key]
-                        row_class = "highlight" if result["failed"] > 0 else ""
-                        
-                        f.write(f"""        <tr class="{row_class}">
-            <td>{width}</td>
-            <td>{pipe_stages}</td>
-            <td class="passed">{result["passed"]}</td>
-            <td class="failed">{result["failed"]}</td>
-            <td>{result["duration"]:.1f}</td>
-            <td><a href="w{width}_p{pipe_stages}/report.html">View Details</a></td>
-        </tr>
+    def _append_dashboard_row(self, f, width: int, pipe_stages: int, result: Dict[str, int]):
+        """Append a configuration's row to the dashboard"""
+        row_class = "highlight" if result["failed"] > 0 else ""
+        f.write(f"""<tr class="{row_class}">
+<td>{width}</td>
+<td>{pipe_stages}</td>
+<td class="passed">{result["passed"]}</td>
+<td class="failed">{result["failed"]}</td>
+<td>{result["duration"]:.1f}</td>
+<td><a href="w{width}_p{pipe_stages}/report.html">View Details</a></td>
+</tr>
 """)
-            
-            # Add heat map section
-            f.write("""    </table>
     
-    <h2>Heat Map: Pass Rate by Configuration</h2>
-    <table class="config-table">
-        <tr>
-            <th>Width / Pipeline Stages</th>
-""")
+    def _finish_dashboard(self, html_file: str):
+        """Rewrite the dashboard in sweep order with the overall summary and heat map"""
+        # Render heat map column headers (pipeline stages)
+        heat_map_columns = "".join(f"<th>{pipe_stages}</th>\n" for pipe_stages in self.pipe_stages)
+        
+        # Render rows for each width with heat map cells
+        heat_map_rows: List[str] = []
+        for width in self.widths:
+            heat_map_rows.append(f"<tr>\n<td>{width}</td>\n")
             
-            # Add column headers (pipeline stages)
             for pipe_stages in self.pipe_stages:
-                f.write(f"            <th>{pipe_stages}</th>\n")
-            
-            f.write("        </tr>\n")
+                config_key = f"{width}_{pipe_stages}"
+                if config_key in self.config_results:
+                    result = self.config_results[config_key]
+                    passed = result["passed"]
+                    total = passed + result["failed"]
+                    pass_rate = int((passed * 100) / total) if total > 0 else 0
+                    
+                    heat_map_rows.append(f'<td style="background-color: {HEAT_MAP_COLORS[pass_rate]}; color: white; text-align: center;">{pass_rate}%</td>\n')
+                else:
+                    heat_map_rows.append('<td>N/A</td>\n')
             
-            # Add rows for each width with heat map cells
+            heat_map_rows.append("</tr>\n")
+        
+        summary_class = "success" if self.total_failed == 0 else "failure"
+        summary_text = "ALL TESTS PASSED! 🎉" if self.total_failed == 0 else f"SOME TESTS FAILED! ❌ ({self.total_failed} out of {self.total_tests})"
+        
+        # The live dashboard lists configurations in completion order; write the
+        # final one with the overall summary on top and the configurations in
+        # sweep order, and swap it in with os.replace
+        tmp_file = f"{html_file}.tmp"
+        with open(tmp_file, "w") as f:
+            f.write(minify_html(self._dashboard_header_tpl.substitute(style=self._style)))
+            f.write(minify_html(self._dashboard_summary_tpl.substitute(
+                date=self._now_str,
+                num_widths=len(self.widths), num_pipe_stages=len(self.pipe_stages),
+                num_configs=self._total_configs,
+                total_tests=self.total_tests, total_passed=self.total_passed,
+                total_failed=self.total_failed, total_duration=f"{self.total_duration:.1f}"
+            )))
+            f.write(self._dashboard_results)
             for width in self.widths:
-                f.write(f"        <tr>\n            <td>{width}</td>\n")
-                
                 for pipe_stages in self.pipe_stages:
-                    config_key = f"{width}_{pipe_stages}"
-                    if config_key in self.config_results:
-                        result = self.config_results[config_key]
-                        passed = result["passed"]
-                        total = passed + result["failed"]
-                        pass_rate = int((passed * 100) / total) if total > 0 else 0
-                        
-                        # Calculate background color based on pass rate (green to red gradient)
-                        r = max(0, min(255, 255 - pass_rate * 2))
-                        g = max(0, min(255, 55 + pass_rate * 2))
-                        b = 50
-                        
-                        f.write(f'            <td style="background-color: rgb({r}, {g}, {b}); color: white; text-align: center;">{pass_rate}%</td>\n')
-                    else:
-                        f.write('            <td>N/A</td>\n')
-                
-                f.write("        </tr>\n")
-            
-            # Add summary box and close HTML
-            summary_class = "success" if self.total_failed == 0 else "failure"
-            summary_text = "ALL TESTS PASSED! 🎉" if self.total_failed == 0 else f"SOME TESTS FAILED! ❌ ({self.total_failed} out of {self.total_tests})"
-            
-            f.write(f"""    </table>
-    
-    <div class="summary-box {summary_class}">
-        {summary_text}
-    </div>
-</body>
-</html>
-""")
+                    self._append_dashboard_row(f, width, pipe_stages,
+                                               self.config_results[f"{width}_{pipe_stages}"])
+            f.write(minify_html(self._dashboard_footer_tpl.substitute(
+                heat_map_columns=heat_map_columns, heat_map_rows="".join(heat_map_rows),
+                summary_class=summary_class, summary_text=summary_text
+            )))
+        os.replace(tmp_file, html_file)
 
 
 def parse_arguments():
@@ -441,17 +739,35 @@ def parse_arguments():
                         help="Comma-separated list of PIPE_STAGES values to test (default: 2,3,4)")
     parser.add_argument("--modules", type=int, default=25,
                         help="Number of modules to test (default: 25)")
+    parser.add_argument("--jobs", type=int, default=None,
+                        help="Number of module tests to run in parallel (default: number of CPUs)")
+    parser.add_argument("--trace", action="store_true",
+                        help="Build with FST waveform tracing and dump module_<N>.fst per module")
+    parser.add_argument("--force-rebuild", action="store_true",
+                        help="Recompile every configuration even if an up-to-date binary exists")
+    parser.add_argument("--gzip", action="store_true",
+                        help="Also write a .html.gz copy of HTML reports larger than 100 KB")
+    parser.add_argument("--in-process", action="store_true",
+                        help="Build each configuration as a shared library and run modules in-process via ctypes")
+    parser.add_argument("--quiet", action="store_true",
+                        help="Only write logs for failing modules, keeping the last lines of their output")
+    parser.add_argument("-v", "--verbose", action="store_true",
+                        help="Print each module's result as soon as it completes")
     return parser.parse_args()
 
 
 def main():
     """Main function"""
     args = parse_arguments()
+    logging.basicConfig(level=logging.INFO if args.verbose else logging.WARNING,
+                        format="%(message)s", stream=sys.stdout)
     
     # Parse width and pipe_stages lists
     try:
-        widths = [int(w) for w in args.widths.split(",")]
-        pipe_stages = [int(p) for p in args.pipe_stages.split(",")]
+        # Drop repeated values, keeping their order: configurations run in
+        # parallel and would otherwise share build and log directories
+        widths = list(dict.fromkeys(int(w) for w in args.widths.split(",")))
+        pipe_stages = list(dict.fromkeys(int(p) for p in args.pipe_stages.split(",")))
     except ValueError:
         print("Error: WIDTH and PIPE_STAGES must be comma-separated integers")
         sys.exit(1)
@@ -466,9 +782,14 @@ def main():
     if args.modules < 1:
         print("Error: MODULES must be at least 1")
         sys.exit(1)
+    if args.jobs is not None and args.jobs < 1:
+        print("Error: JOBS must be at least 1")
+        sys.exit(1)
     
     # Run test suite
-    test_suite = TestSuite(widths, pipe_stages, args.modules)
+    test_suite = TestSuite(widths, pipe_stages, args.modules, args.jobs,
+                           trace=args.trace, force_rebuild=args.force_rebuild,
+                           gzip_reports=args.gzip, in_process=args.in_process, quiet=args.quiet)
     test_suite.run()
 
 
@@ -0,0 +1,42 @@
+// Shared-library entry point for running the testbench in-process
+//
+// Built by run_simulation_all.py --in-process together with a MODULE_ID=0
+// model, so one loaded library can run every module of a configuration.
+
+#include <cstdio>
+#include <memory>
+#include <string>
+#include <vector>
+
+#include "verilated.h"
+#include "Vtb_pipelined_arithmetic.h"
+
+// Run the testbench for one module and return 0 once it reaches $finish
+extern "C" int run_module(int module_id, const char* dumpfile) {
+    const std::unique_ptr<VerilatedContext> contextp{new VerilatedContext};
+
+    // Plusargs the standalone binary would get on its command line
+    const std::string module_arg = "+MODULE_ID=" + std::to_string(module_id);
+    const std::string dumpfile_arg = dumpfile ? std::string{"+DUMPFILE="} + dumpfile : "";
+    std::vector<const char*> argv{"sim", module_arg.c_str()};
+    if (dumpfile) argv.push_back(dumpfile_arg.c_str());
+    contextp->commandArgs(static_cast<int>(argv.size()), argv.data());
+#if VM_TRACE
+    contextp->traceEverOn(true);
+#endif
+
+    const std::unique_ptr<Vtb_pipelined_arithmetic> topp{
+        new Vtb_pipelined_arithmetic{contextp.get(), "TOP"}};
+
+    // Timing-enabled eval loop, as in the main() Verilator generates for --binary
+    while (!contextp->gotFinish()) {
+        topp->eval();
+        if (!topp->eventsPending()) break;
+        contextp->time(topp->nextTimeSlot());
+    }
+    topp->final();
+
+    // The caller redirects stdout to the module's log around this call
+    std::fflush(stdout);
+    return contextp->gotFinish() ? 0 : 1;
+}
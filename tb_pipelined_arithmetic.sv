@@ -1,7 +1,8 @@
 // Testbench for pipelined arithmetic modules
 
 module tb_pipelined_arithmetic #(
-    parameter MODULE_ID = 1,    // Which arithmetic_opX module to test
+    parameter MODULE_ID = 1,    // Which arithmetic_opX module to test (0: pick at runtime via +MODULE_ID=N)
+    parameter NUM_MODULES = 25, // Number of modules built when MODULE_ID = 0
     parameter WIDTH = 16,       // Data width (between 8 and 32)
     parameter PIPE_STAGES = 3   // Number of pipeline stages
 );
@@ -23,32 +24,80 @@ module tb_pipelined_arithmetic #(
     int error_count = 0;
     bit test_done = 0;
     
-    // DUT instantiations
-    // Version 1: Combinational logic followed by N pipeline stages
-    logic_then_pipe #(
-        .MODULE_ID(MODULE_ID),
-        .WIDTH(WIDTH),
-        .PIPE_STAGES(PIPE_STAGES)
-    ) dut1 (
-        .clk(clk),
-        .reset(reset),
-        .a(a),
-        .b(b),
-        .c(c_logic_then_pipe)
-    );
+    // Module under test (taken from +MODULE_ID=N when MODULE_ID = 0)
+    int module_id = MODULE_ID;
     
-    // Version 2: N pipeline stages followed by combinational logic
-    pipe_then_logic #(
-        .MODULE_ID(MODULE_ID),
-        .WIDTH(WIDTH),
-        .PIPE_STAGES(PIPE_STAGES)
-    ) dut2 (
-        .clk(clk),
-        .reset(reset),
-        .a(a),
-        .b(b),
-        .c(c_pipe_then_logic)
-    );
+    // DUT instantiations
+    generate
+        if (MODULE_ID == 0) begin : g_runtime_select
+            // Build every module once and select the one under test at runtime,
+            // so a single compiled model can test all modules
+            logic [WIDTH-1:0] c_logic_then_pipe_all [1:NUM_MODULES];
+            logic [WIDTH-1:0] c_pipe_then_logic_all [1:NUM_MODULES];
+            
+            for (genvar m = 1; m <= NUM_MODULES; m++) begin : g_module
+                logic_then_pipe #(
+                    .MODULE_ID(m),
+                    .WIDTH(WIDTH),
+                    .PIPE_STAGES(PIPE_STAGES)
+                ) dut1 (
+                    .clk(clk),
+                    .reset(reset),
+                    .a(a),
+                    .b(b),
+                    .c(c_logic_then_pipe_all[m])
+                );
+                
+                pipe_then_logic #(
+                    .MODULE_ID(m),
+                    .WIDTH(WIDTH),
+                    .PIPE_STAGES(PIPE_STAGES)
+                ) dut2 (
+                    .clk(clk),
+                    .reset(reset),
+                    .a(a),
+                    .b(b),
+                    .c(c_pipe_then_logic_all[m])
+                );
+            end
+            
+            always_comb begin
+                if (module_id >= 1 && module_id <= NUM_MODULES) begin
+                    c_logic_then_pipe = c_logic_then_pipe_all[module_id];
+                    c_pipe_then_logic = c_pipe_then_logic_all[module_id];
+                end else begin
+                    c_logic_then_pipe = '0;
+                    c_pipe_then_logic = '0;
+                end
+            end
+        end else begin : g_fixed
+            // Version 1: Combinational logic followed by N pipeline stages
+            logic_then_pipe #(
+                .MODULE_ID(MODULE_ID),
+                .WIDTH(WIDTH),
+                .PIPE_STAGES(PIPE_STAGES)
+            ) dut1 (
+                .clk(clk),
+                .reset(reset),
+                .a(a),
+                .b(b),
+                .c(c_logic_then_pipe)
+            );
+            
+            // Version 2: N pipeline stages followed by combinational logic
+            pipe_then_logic #(
+                .MODULE_ID(MODULE_ID),
+                .WIDTH(WIDTH),
+                .PIPE_STAGES(PIPE_STAGES)
+            ) dut2 (
+                .clk(clk),
+                .reset(reset),
+                .a(a),
+                .b(b),
+                .c(c_pipe_then_logic)
+            );
+        end
+    endgenerate
     
     // Clock generation
     always #5 clk = ~clk;
@@ -56,7 +105,14 @@ module tb_pipelined_arithmetic #(
     // Stimulus generation
     initial begin
         $display("TEST START");
-        $display("Testing MODULE_ID = %0d, WIDTH = %0d, PIPE_STAGES = %0d", MODULE_ID, WIDTH, PIPE_STAGES);
+        if (MODULE_ID == 0) begin
+            if (!$value$plusargs("MODULE_ID=%d", module_id) || module_id < 1 || module_id > NUM_MODULES) begin
+                $display("ERROR: +MODULE_ID=N (1-%0d) is required when MODULE_ID = 0", NUM_MODULES);
+                $display("TEST FAILED");
+                $finish;
+            end
+        end
+        $display("Testing MODULE_ID = %0d, WIDTH = %0d, PIPE_STAGES = %0d", module_id, WIDTH, PIPE_STAGES);
         
         // Apply reset
         reset = 1;
@@ -119,7 +175,9 @@ module tb_pipelined_arithmetic #(
     
     // Dump waveforms
     initial begin
-        $dumpfile("dumpfile.fst");
+        string dumpfile;
+        if (!$value$plusargs("DUMPFILE=%s", dumpfile)) dumpfile = "dumpfile.fst";
+        $dumpfile(dumpfile);
         $dumpvars(0);
     end
 